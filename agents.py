@@ -1,12 +1,25 @@
 import os
-import json
-from typing import List, Optional
+import re
+import codecs
+import msgspec
+import asyncio
+import hashlib
+import threading
+import bisect
+import itertools
+from typing import Dict, Final, List, Optional, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
-from groq import Groq
-from models import Claim, Evidence, ScoreResponse, CrisisAlert, CrisisResponse
+from groq import Groq, AsyncGroq
+from models import Claim, Evidence, ScoreResponse, ScorePayload, CrisisAlert, CrisisResponse
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+import httpx
+import ahocorasick
+import xxhash
+from cachetools import TTLCache
+from selectolax.lexbor import LexborHTMLParser
+import lxml.html
 
 load_dotenv()
 
@@ -14,63 +27,134 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 NEWSDATA_API_KEY = os.getenv("NEWSDATA_API_KEY")
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 
+NEWSDATA_URL = "https://newsdata.io/api/1/news"
+
+# Pooled session for blocking calls (SerpAPI) so searches reuse TLS connections
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=20))
+
+# Upper bound on how much of a user-supplied page is downloaded and parsed
+MAX_LINK_BYTES = 256 * 1024
+LINK_FETCH_HEADERS = {
+    "Accept-Encoding": "gzip",
+    "Range": f"bytes=0-{MAX_LINK_BYTES - 1}"
+}
+
+# Shared async client so concurrent category scans reuse pooled connections
+http_client = httpx.AsyncClient(
+    http2=True,
+    timeout=10,
+    limits=httpx.Limits(max_keepalive_connections=20)
+)
+
+# Title hashes of articles returned by recent scans, shared across calls
+_seen_articles = TTLCache(maxsize=50_000, ttl=3600)
+# Scans may run concurrently in the threadpool; TTLCache is not thread-safe
+_seen_articles_lock = threading.Lock()
+
+def articles_to_claims(articles: List[dict], seen: Optional[TTLCache] = None) -> List[Claim]:
+    """
+    Convert NewsData articles to claims, dropping duplicate titles.
+    Titles are deduplicated on a 64-bit xxhash; if `seen` is given, titles
+    already recorded there are skipped as well and new ones are added.
+    """
+    claims = []
+    batch_seen = set()
+    # One timestamp for the whole batch instead of a clock read per claim
+    now = datetime.now()
+    for article in articles:
+        title = article.get('title', 'No title')
+        h = xxhash.xxh64_intdigest(title.encode())
+        if h in batch_seen:
+            continue
+        batch_seen.add(h)
+        if seen is not None:
+            with _seen_articles_lock:
+                if h in seen:
+                    continue
+                seen[h] = None
+        claims.append(Claim(
+            text=title,
+            source=article.get('source_id', 'newsdata'),
+            status="unverified",
+            timestamp=now,
+            evidence=[Evidence(
+                source=article.get('source_id', 'newsdata'),
+                content=article.get('description', '') or title,
+                url=article.get('link', '')
+            )]
+        ))
+    return claims
+
+# Recent category scans; the feed barely changes within a minute
+_category_cache = TTLCache(maxsize=32, ttl=60)
+
+# Map frontend categories to NewsData API categories
+CATEGORY_MAPPING: Final = {
+    "general-news": "top",
+    "politics": "politics",
+    "health": "health",
+    "crisis": "world",
+    "finance": "business",
+    "tech-ai": "technology",
+    "science": "science",
+    "crime": "crime",
+    "international": "world",
+    "social": "entertainment"
+}
+
+# Mock headlines per frontend category, used when the API is unavailable
+MOCK_DATA: Final = {
+    "general-news": "Breaking: Major developments in global affairs.",
+    "politics": "Election results show surprising turnout.",
+    "health": "New health guidelines announced by WHO.",
+    "crisis": "Emergency response teams deployed to affected areas.",
+    "finance": "Stock markets show mixed signals amid economic uncertainty.",
+    "tech-ai": "AI breakthrough announced by leading tech company.",
+    "science": "Scientists discover new insights into climate patterns.",
+    "crime": "Law enforcement reports decrease in crime rates.",
+    "international": "International summit addresses global challenges.",
+    "social": "Viral social media trend sparks global conversation."
+}
+
 class ScanAgent:
     def __init__(self):
         self.api_key = NEWSDATA_API_KEY
         if not self.api_key:
             print("WARNING: NEWSDATA_API_KEY not set. Using mock data for news scanning.")
-        
-        # Map frontend categories to NewsData API categories
-        self.category_mapping = {
-            "general-news": "top",
-            "politics": "politics",
-            "health": "health",
-            "crisis": "world",
-            "finance": "business",
-            "tech-ai": "technology",
-            "science": "science",
-            "crime": "crime",
-            "international": "world",
-            "social": "entertainment"
-        }
-
-    def scan_by_category(self, category: str) -> List[Claim]:
+
+    async def scan_by_category(self, category: str) -> List[Claim]:
         """Scan news by category"""
+        cached = _category_cache.get(category)
+        if cached is not None:
+            print(f"Using cached {category} news")
+            return list(cached)
+
         claims = []
         
         # Map frontend category to NewsData category
-        api_category = self.category_mapping.get(category, "top")
+        api_category = CATEGORY_MAPPING.get(category, "top")
         
         if self.api_key:
             try:
-                from newsdataapi import NewsDataApiClient
-                api = NewsDataApiClient(apikey=self.api_key)
                 print(f"Fetching {category} news (API category: {api_category})...")
                 
                 # Fetch news for specific category
-                response = api.news_api(category=api_category, language="en")
+                http_response = await http_client.get(NEWSDATA_URL, params={
+                    "apikey": self.api_key,
+                    "category": api_category,
+                    "language": "en"
+                })
+                http_response.raise_for_status()
+                response = http_response.json()
                 
                 if response and 'results' in response:
-                    seen_titles = set()
-                    for article in response['results']:
-                        title = article.get('title', 'No title')
-                        if title not in seen_titles:
-                            seen_titles.add(title)
-                            claims.append(Claim(
-                                text=title,
-                                source=article.get('source_id', 'newsdata'),
-                                status="unverified",
-                                evidence=[Evidence(
-                                    source=article.get('source_id', 'newsdata'),
-                                    content=article.get('description', '') or title,
-                                    url=article.get('link', '')
-                                )]
-                            ))
+                    claims = articles_to_claims(response['results'])
                     print(f"Successfully fetched {len(claims)} articles for {category}")
+                    if claims:
+                        _category_cache[category] = claims
                 else:
                     print(f"No results from NewsData API for {category}")
-            except ImportError as e:
-                print(f"ERROR: Failed to import newsdataapi: {e}")
             except Exception as e:
                 print(f"ERROR: Failed to fetch {category} news: {e}")
         else:
@@ -81,30 +165,27 @@ class ScanAgent:
             claims = self._get_mock_news_by_category(category)
         
         return claims
+
+    async def scan_categories(self, cats: List[str]) -> Dict[str, List[Claim]]:
+        """Scan several categories concurrently"""
+        results = await asyncio.gather(*(self.scan_by_category(c) for c in cats))
+        return dict(zip(cats, results))
     
     def _get_mock_news_by_category(self, category: str) -> List[Claim]:
         """Generate mock news for a category"""
-        mock_data = {
-            "general-news": "Breaking: Major developments in global affairs.",
-            "politics": "Election results show surprising turnout.",
-            "health": "New health guidelines announced by WHO.",
-            "crisis": "Emergency response teams deployed to affected areas.",
-            "finance": "Stock markets show mixed signals amid economic uncertainty.",
-            "tech-ai": "AI breakthrough announced by leading tech company.",
-            "science": "Scientists discover new insights into climate patterns.",
-            "crime": "Law enforcement reports decrease in crime rates.",
-            "international": "International summit addresses global challenges.",
-            "social": "Viral social media trend sparks global conversation."
-        }
-        
         return [Claim(
-            text=mock_data.get(category, "Latest news update."),
+            text=MOCK_DATA.get(category, "Latest news update."),
             source="mock_data",
             status="unverified"
         )]
 
-    def scan(self, source_url: Optional[str] = None) -> List[Claim]:
+    def scan(self, source_url: Optional[str] = None, only_new: bool = False) -> List[Claim]:
+        """
+        Scan for crisis news. With only_new, articles returned by a scan in
+        the last hour are skipped so periodic scans don't re-add them.
+        """
         claims = []
+        skip_mock = False
         if self.api_key:
             try:
                 from newsdataapi import NewsDataApiClient
@@ -114,22 +195,10 @@ class ScanAgent:
                 response = api.news_api(q="crisis OR war OR disaster OR emergency OR earthquake OR attack", language="en", country="us")
                 
                 if response and 'results' in response:
-                    seen_titles = set()
-                    for article in response['results']:
-                        title = article.get('title', 'No title')
-                        if title not in seen_titles:
-                            seen_titles.add(title)
-                            claims.append(Claim(
-                                text=title,
-                                source=article.get('source_id', 'newsdata'),
-                                status="unverified",
-                                evidence=[Evidence(
-                                    source=article.get('source_id', 'newsdata'),
-                                    content=article.get('description', '') or title,
-                                    url=article.get('link', '')
-                                )]
-                            ))
-                    print(f"Successfully scanned {len(claims)} news articles")
+                    claims = articles_to_claims(response['results'], seen=_seen_articles if only_new else None)
+                    print(f"Successfully scanned {len(claims)} new articles out of {len(response['results'])}")
+                    # Everything was already seen recently; nothing new to report
+                    skip_mock = only_new and bool(response['results'])
                 else:
                     print("No results from NewsData API")
             except ImportError as e:
@@ -139,7 +208,7 @@ class ScanAgent:
         else:
             print("Using mock data (no NEWSDATA_API_KEY)")
         
-        if not claims:
+        if not claims and not skip_mock:
             # Fallback mock data if API fails or returns nothing
             print("Returning mock crisis data")
             claims.append(Claim(
@@ -149,45 +218,86 @@ class ScanAgent:
             ))
         return claims
 
+# Claims with fewer meaningful words than this are not worth a web search
+MIN_SEARCH_TOKENS = 3
+
+STOPWORDS: Final = frozenset({
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "am", "it", "its",
+    "this", "that", "these", "those", "of", "in", "on", "at", "to", "for", "from",
+    "by", "with", "and", "or", "but", "not", "no", "so", "as", "if", "do", "does",
+    "did", "has", "have", "had", "i", "you", "he", "she", "we", "they", "me", "my",
+    "your", "our", "their", "what", "which", "who", "how", "why", "when", "where"
+})
+
+# Search evidence keyed by query; searches run in worker threads, hence the lock
+_search_cache = TTLCache(maxsize=1024, ttl=600)
+_search_cache_lock = threading.Lock()
+
+def is_searchable(text: str) -> bool:
+    """Whether the text has enough non-stopword tokens to be worth searching"""
+    tokens = [t for t in text.lower().split() if t not in STOPWORDS]
+    return len(tokens) >= MIN_SEARCH_TOKENS
+
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w.:-]+)""", re.IGNORECASE)
+
+def decode_html(content: bytes, charset: Optional[str] = None) -> str:
+    """
+    Decode HTML using the HTTP charset, then any <meta charset> in the head,
+    then UTF-8. The body may be cut off mid-character, so a trailing partial
+    sequence is dropped rather than failing the decode.
+    """
+    meta = META_CHARSET_RE.search(content[:2048])
+    candidates = [charset, meta.group(1).decode("ascii", "ignore") if meta else None, "utf-8"]
+    for encoding in filter(None, candidates):
+        try:
+            return codecs.getincrementaldecoder(encoding)().decode(content, final=False)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    # Undeclared legacy page that isn't UTF-8; cp1252 is what browsers assume
+    return content.decode("cp1252", errors="replace")
+
+def parse_html(content: bytes, charset: Optional[str] = None) -> Tuple[Optional[str], str]:
+    """Extract the page title and visible text from raw HTML"""
+    html = decode_html(content, charset)
+    try:
+        tree = LexborHTMLParser(html)
+        title_node = tree.css_first('title')
+        title = title_node.text(strip=True) if title_node else None
+        root = tree.body or tree.root
+        text = root.text(separator=' ') if root else ""
+    except Exception as e:
+        # selectolax could not handle the document; fall back to lxml
+        print(f"WARNING: selectolax failed to parse HTML, using lxml: {e}")
+        doc = lxml.html.fromstring(html)
+        title = doc.findtext('.//title')
+        text = doc.text_content()
+    return title, text
+
 class VerifyAgent:
-    def verify(self, claim: Claim, link: Optional[str] = None, image_content: Optional[bytes] = None) -> Claim:
+    async def verify(self, claim: Claim, link: Optional[str] = None, image_content: Optional[bytes] = None) -> Claim:
         print(f"Verifying claim: {claim.text}")
-        
+
+        # If claim text is empty, derive it from the inputs so the search
+        # can run alongside the link fetch
+        if not claim.text:
+            if link:
+                claim.text = f"Check content from {link}"
+            elif image_content:
+                claim.text = "Verify uploaded image content"
+
+        # Fetch the link and run the web search concurrently
+        link_task = asyncio.create_task(self._fetch_link(link)) if link else None
+        searchable = bool(claim.text) and is_searchable(claim.text)
+        search_task = asyncio.create_task(asyncio.to_thread(self._search, claim.text)) if searchable else None
+        await asyncio.gather(*(t for t in (link_task, search_task) if t), return_exceptions=True)
+
         # Process Link
-        if link:
-            try:
-                print(f"Fetching content from link: {link}")
-                response = requests.get(link, timeout=10)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-                title = soup.title.string if soup.title else link
-                text_content = soup.get_text()[:1000] # Limit content
-                
-                claim.evidence.append(Evidence(
-                    source=f"User Link: {title}",
-                    content=f"Extracted content: {text_content}...",
-                    url=link
-                ))
-                
-                # If claim text is empty, use the link title/content
-                if not claim.text:
-                    claim.text = f"Check content from {link}"
-                print(f"Successfully extracted content from link")
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"ERROR: Failed to fetch link {link}: {e}")
-                claim.evidence.append(Evidence(
-                    source="User Link",
-                    content=f"Failed to fetch content from {link}: {str(e)}",
-                    url=link
-                ))
-            except Exception as e:
-                print(f"ERROR: Unexpected error processing link: {e}")
-                claim.evidence.append(Evidence(
-                    source="User Link",
-                    content=f"Error processing link: {str(e)}",
-                    url=link
-                ))
+        if link_task:
+            claim.evidence.append(self._task_result(link_task, Evidence(
+                source="User Link",
+                content=f"Error processing link: {link}",
+                url=link
+            )))
 
         # Process Image (Placeholder for now)
         if image_content:
@@ -197,82 +307,174 @@ class VerifyAgent:
                 content="Image received. (Vision analysis not yet implemented)",
                 url="Uploaded Image"
             ))
-            if not claim.text:
-                claim.text = "Verify uploaded image content"
 
-        # Perform Search Verification using SerpAPI
-        if claim.text:
-            try:
-                if SERPAPI_KEY:
-                    print(f"Searching with SerpAPI for: {claim.text}")
-                    
-                    # Call SerpAPI
-                    params = {
-                        "q": claim.text,
-                        "api_key": SERPAPI_KEY,
-                        "num": 3  # Get top 3 results
-                    }
-                    
-                    response = requests.get("https://serpapi.com/search", params=params, timeout=60)
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    # Extract organic search results
-                    if 'organic_results' in result and len(result['organic_results']) > 0:
-                        for item in result['organic_results'][:3]:
-                            claim.evidence.append(Evidence(
-                                source=item.get('title', 'Unknown'),
-                                content=item.get('snippet', ''),
-                                url=item.get('link', '')
-                            ))
-                        print(f"Found {len(result['organic_results'][:3])} search results")
-                    else:
-                        print("No search results found")
-                        # Add fallback evidence
-                        claim.evidence.append(Evidence(
-                            source="Search Info",
-                            content=f"No search results found for: {claim.text}",
-                            url=""
-                        ))
-                else:
-                    print("WARNING: SERPAPI_KEY not set")
-                    # Add fallback evidence when API key is missing
-                    claim.evidence.append(Evidence(
-                        source="Configuration Required",
-                        content=f"Search functionality requires SerpAPI configuration. Claim: {claim.text}",
-                        url=""
-                    ))
-            except Exception as e:
-                print(f"ERROR: SerpAPI search failed: {e}")
-                # Add error as evidence so array is never empty
-                claim.evidence.append(Evidence(
-                    source="Search Error",
-                    content=f"Failed to perform web search: {str(e)}. Claim: {claim.text}",
-                    url=""
-                ))
+        # Search results
+        if search_task:
+            claim.evidence.extend(self._task_result(search_task, [Evidence(
+                source="Search Error",
+                content=f"Failed to perform web search. Claim: {claim.text}",
+                url=""
+            )]))
+        elif claim.text:
+            print(f"Skipping web search for short claim: {claim.text}")
+            # Keep the evidence array non-empty
+            claim.evidence.append(Evidence(
+                source="Search Info",
+                content=f"Claim too short for a reliable web search: {claim.text}",
+                url=""
+            ))
         
         return claim
 
+    @staticmethod
+    def _task_result(task: asyncio.Task, fallback):
+        if task.exception():
+            print(f"ERROR: Verification task failed: {task.exception()}")
+            return fallback
+        return task.result()
+
+    async def _fetch_link(self, link: str) -> Evidence:
+        try:
+            print(f"Fetching content from link: {link}")
+            # Only the start of the page is needed, so stop reading past the cap
+            content = bytearray()
+            async with http_client.stream("GET", link, headers=LINK_FETCH_HEADERS, follow_redirects=True) as response:
+                response.raise_for_status()
+                charset = response.charset_encoding
+                async for chunk in response.aiter_bytes():
+                    content += chunk
+                    if len(content) >= MAX_LINK_BYTES:
+                        break
+            title, text_content = await asyncio.to_thread(parse_html, bytes(content[:MAX_LINK_BYTES]), charset)
+            title = title or link
+            text_content = text_content[:1000] # Limit content
+            print(f"Successfully extracted content from link")
+            return Evidence(
+                source=f"User Link: {title}",
+                content=f"Extracted content: {text_content}...",
+                url=link
+            )
+        except httpx.HTTPError as e:
+            print(f"ERROR: Failed to fetch link {link}: {e}")
+            return Evidence(
+                source="User Link",
+                content=f"Failed to fetch content from {link}: {str(e)}",
+                url=link
+            )
+        except Exception as e:
+            print(f"ERROR: Unexpected error processing link: {e}")
+            return Evidence(
+                source="User Link",
+                content=f"Error processing link: {str(e)}",
+                url=link
+            )
+
+    def _search(self, query: str) -> List[Evidence]:
+        """Perform Search Verification using SerpAPI (blocking; run in a thread)"""
+        with _search_cache_lock:
+            cached = _search_cache.get(query)
+        if cached is not None:
+            print(f"Using cached search results for: {query}")
+            return list(cached)
+
+        try:
+            if SERPAPI_KEY:
+                print(f"Searching with SerpAPI for: {query}")
+                
+                # Call SerpAPI
+                params = {
+                    "q": query,
+                    "api_key": SERPAPI_KEY,
+                    "num": 3  # Get top 3 results
+                }
+                
+                response = SESSION.get("https://serpapi.com/search", params=params, timeout=60)
+                response.raise_for_status()
+                result = response.json()
+                
+                # Extract organic search results
+                if 'organic_results' in result and len(result['organic_results']) > 0:
+                    evidence = [Evidence(
+                        source=item.get('title', 'Unknown'),
+                        content=item.get('snippet', ''),
+                        url=item.get('link', '')
+                    ) for item in result['organic_results'][:3]]
+                    print(f"Found {len(evidence)} search results")
+                else:
+                    print("No search results found")
+                    # Add fallback evidence
+                    evidence = [Evidence(
+                        source="Search Info",
+                        content=f"No search results found for: {query}",
+                        url=""
+                    )]
+                with _search_cache_lock:
+                    _search_cache[query] = evidence
+                return list(evidence)
+
+            print("WARNING: SERPAPI_KEY not set")
+            # Add fallback evidence when API key is missing
+            return [Evidence(
+                source="Configuration Required",
+                content=f"Search functionality requires SerpAPI configuration. Claim: {query}",
+                url=""
+            )]
+        except Exception as e:
+            print(f"ERROR: SerpAPI search failed: {e}")
+            # Add error as evidence so array is never empty
+            return [Evidence(
+                source="Search Error",
+                content=f"Failed to perform web search: {str(e)}. Claim: {query}",
+                url=""
+            )]
+
+# Explanations produced alongside scores, keyed by (claim_text, verdict, lang)
+_explanation_cache = TTLCache(maxsize=1024, ttl=3600)
+# Written on the event loop, read by ExplainAgent in the threadpool
+_explanation_cache_lock = threading.Lock()
+
+# Strict types, but lax enough for numbers the LLM sends as strings
+_score_decoder = msgspec.json.Decoder(ScorePayload, strict=False)
+
+def _unverified_score() -> ScoreResponse:
+    return ScoreResponse(
+        final_score=0,
+        source_reliability=0,
+        evidence_strength=0,
+        consistency=0,
+        verdict="UNVERIFIED"
+    )
+
+# Matches the Groq SDK default; set explicitly so a custom http_client can't shorten it
+GROQ_TIMEOUT = 60.0
+
 class ScoreAgent:
-    def __init__(self):
-        self.client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        # Explicit timeout: with a custom http_client the SDK would otherwise
+        # inherit that client's (much shorter) timeout
+        self.client = AsyncGroq(api_key=GROQ_API_KEY, http_client=http_client, timeout=GROQ_TIMEOUT) if GROQ_API_KEY else None
         if not self.client:
             print("WARNING: GROQ_API_KEY not set. Scoring will return UNVERIFIED.")
 
-    def score(self, claim: Claim) -> ScoreResponse:
-        if not self.client:
-            # Fallback if no API key
-            print("ERROR: Cannot score claim - no GROQ_API_KEY configured")
-            return ScoreResponse(
-                final_score=0,
-                source_reliability=0,
-                evidence_strength=0,
-                consistency=0,
-                verdict="UNVERIFIED"
-            )
+        # Raw Groq responses keyed by a hash of the claim and its evidence
+        self._cache = TTLCache(maxsize=1024, ttl=3600)
+
+    @staticmethod
+    def _cache_key(claim: Claim, lang: Optional[str] = None) -> bytes:
+        evidence = "|".join(sorted(e.content for e in claim.evidence))
+        if lang:
+            evidence += f"|explain:{lang}"
+        return hashlib.sha256((claim.text + evidence).encode()).digest()
+
+    def has_result(self, claim: Claim, lang: Optional[str] = None) -> bool:
+        """Whether a real LLM result is cached for this claim; fallbacks never are"""
+        return self._cache_key(claim, lang) in self._cache
 
+    @staticmethod
+    def _build_prompt(claim: Claim, lang: Optional[str] = None) -> str:
         evidence_text = "\n".join([f"- {e.content} ({e.url})" for e in claim.evidence])
-        prompt = f"""
+        explanation_key = f"- explanation (concise explanation of the verdict, in language: {lang})" if lang else ""
+        return f"""
         Analyze the following claim based on the evidence provided.
         Claim: {claim.text}
         Evidence:
@@ -284,39 +486,79 @@ class ScoreAgent:
         - evidence_strength (0-100)
         - consistency (0-100)
         - verdict (VERIFIED, FALSE, MIXED, UNVERIFIED)
+        {explanation_key}
         """
-        
+
+    async def _complete(self, key: bytes, prompt: str, claim: Claim) -> str:
+        """Return the raw JSON completion for a prompt, from cache when possible"""
+        raw = self._cache.get(key)
+        if raw is not None:
+            print(f"Using cached score for claim: {claim.text[:50]}...")
+            return raw
+
+        print(f"Scoring claim with Groq AI: {claim.text[:50]}...")
+        chat_completion = await self.client.chat.completions.create(
+            messages=[
+                {"role": "system", "content": "You are a fact-checking AI. Output ONLY JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            model="llama-3.3-70b-versatile",
+            response_format={"type": "json_object"}
+        )
+        return chat_completion.choices[0].message.content
+
+    async def score(self, claim: Claim) -> ScoreResponse:
+        if not self.client:
+            # Fallback if no API key
+            print("ERROR: Cannot score claim - no GROQ_API_KEY configured")
+            return _unverified_score()
+
+        key = self._cache_key(claim)
         try:
-            print(f"Scoring claim with Groq AI: {claim.text[:50]}...")
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are a fact-checking AI. Output ONLY JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="llama-3.3-70b-versatile",
-                response_format={"type": "json_object"}
-            )
-            result = json.loads(chat_completion.choices[0].message.content)
-            print(f"Scoring complete: {result.get('verdict', 'UNKNOWN')}")
-            return ScoreResponse(**result)
-        except json.JSONDecodeError as e:
+            raw = await self._complete(key, self._build_prompt(claim), claim)
+            payload = _score_decoder.decode(raw)
+            print(f"Scoring complete: {payload.verdict}")
+            response = payload.to_response()
+            # Only cache responses that parsed into a valid score
+            self._cache[key] = raw
+            return response
+        except msgspec.DecodeError as e:
             print(f"ERROR: Failed to parse Groq response as JSON: {e}")
-            return ScoreResponse(
-                final_score=0,
-                source_reliability=0,
-                evidence_strength=0,
-                consistency=0,
-                verdict="UNVERIFIED"
-            )
+            return _unverified_score()
         except Exception as e:
             print(f"ERROR: Groq API call failed: {e}")
-            return ScoreResponse(
-                final_score=0,
-                source_reliability=0,
-                evidence_strength=0,
-                consistency=0,
-                verdict="UNVERIFIED"
-            )
+            return _unverified_score()
+
+    async def score_and_explain(self, claim: Claim, lang: str = "en") -> Tuple[ScoreResponse, str]:
+        """
+        Score a claim and explain the verdict with a single Groq call.
+        The explanation is also cached for ExplainAgent.
+        """
+        if not self.client:
+            print("ERROR: Cannot score claim - no GROQ_API_KEY configured")
+            return _unverified_score(), "Explanation unavailable (No GROQ_API_KEY configured)."
+
+        key = self._cache_key(claim, lang)
+        try:
+            raw = await self._complete(key, self._build_prompt(claim, lang), claim)
+            return self._score_with_explanation(key, raw, claim, lang)
+        except msgspec.DecodeError as e:
+            print(f"ERROR: Failed to parse Groq response as JSON: {e}")
+            return _unverified_score(), f"Error generating explanation: {str(e)}"
+        except Exception as e:
+            print(f"ERROR: Groq API call failed: {e}")
+            return _unverified_score(), f"Error generating explanation: {str(e)}"
+
+    def _score_with_explanation(self, key: bytes, raw: str, claim: Claim, lang: str) -> Tuple[ScoreResponse, str]:
+        """Parse a raw score+explanation payload and cache it on success"""
+        payload = _score_decoder.decode(raw)
+        explanation = payload.explanation or "No explanation provided."
+        print(f"Scoring complete: {payload.verdict}")
+        response = payload.to_response()
+        self._cache[key] = raw
+        with _explanation_cache_lock:
+            _explanation_cache[(claim.text, response.verdict, lang)] = explanation
+        return response, explanation
 
 class ExplainAgent:
     def __init__(self):
@@ -329,6 +571,13 @@ class ExplainAgent:
             print("ERROR: Cannot generate explanation - no GROQ_API_KEY configured")
             return "Explanation unavailable (No GROQ_API_KEY configured)."
 
+        # Reuse the explanation from a combined score_and_explain call
+        with _explanation_cache_lock:
+            cached = _explanation_cache.get((claim_text, verdict, lang))
+        if cached:
+            print(f"Using cached explanation for verdict: {verdict}")
+            return cached
+
         prompt = f"Explain why the claim '{claim_text}' was judged as {verdict}. Language: {lang}. Keep it concise."
         
         try:
@@ -347,23 +596,55 @@ class ExplainAgent:
             print(f"ERROR: Failed to generate explanation: {e}")
             return f"Error generating explanation: {str(e)}"
 
+CRISIS_KEYWORDS: Final = (
+    "earthquake", "pandemic", "violence", "tsunami", "terror", "flood", "war", "attack", "assassinated", 
+    "airstrike", "conflict", "dead", "killed", "crisis", "warning", "strike", "military", "navy", 
+    "russia", "israel", "lebanon", "gaza", "ukraine", "iran", "missile", "bomb", "blast", "explosion", 
+    "fire", "wildfire", "storm", "hurricane", "tornado", "typhoon", "cyclone", "weather", "heat", 
+    "emergency", "rescue", "police", "arrest", "shoot", "gun", "crime", "murder", "crash", "accident", 
+    "disaster", "danger", "threat", "alert", "breaking"
+)
+
+def _build_crisis_automaton() -> ahocorasick.Automaton:
+    automaton = ahocorasick.Automaton()
+    for index, keyword in enumerate(CRISIS_KEYWORDS):
+        automaton.add_word(keyword, (index, keyword))
+    automaton.make_automaton()
+    return automaton
+
+# Built once at import and shared by every CrisisAgent; matching only reads it
+_crisis_automaton = _build_crisis_automaton()
+
 class CrisisAgent:
+    def _match_keywords(self, claims: List[Claim]) -> List[List[str]]:
+        """
+        Find the crisis keywords in each claim with one automaton pass over
+        all claim texts joined together. Hits are mapped back to their claim
+        by bisecting the cumulative end offsets.
+        """
+        texts = [claim.text for claim in claims]
+        corpus = "\n".join(texts).lower()
+        if len(corpus) != sum(len(t) for t in texts) + max(len(texts) - 1, 0):
+            # Lowering expanded some characters, so lower per claim to keep offsets aligned
+            texts = [t.lower() for t in texts]
+            corpus = "\n".join(texts)
+        ends = list(itertools.accumulate(len(t) + 1 for t in texts))
+
+        hits = [set() for _ in claims]
+        for end_index, value in _crisis_automaton.iter(corpus):
+            hits[bisect.bisect_right(ends, end_index)].add(value)
+        # Keep keywords in list order, matching the previous output
+        return [[k for _, k in sorted(h)] for h in hits]
+
     def detect_crisis(self, claims: List[Claim]) -> CrisisResponse:
         alerts = []
-        keywords = [
-            "earthquake", "pandemic", "violence", "tsunami", "terror", "flood", "war", "attack", "assassinated", 
-            "airstrike", "conflict", "dead", "killed", "crisis", "warning", "strike", "military", "navy", 
-            "russia", "israel", "lebanon", "gaza", "ukraine", "iran", "missile", "bomb", "blast", "explosion", 
-            "fire", "wildfire", "storm", "hurricane", "tornado", "typhoon", "cyclone", "weather", "heat", 
-            "emergency", "rescue", "police", "arrest", "shoot", "gun", "crime", "murder", "crash", "accident", 
-            "disaster", "danger", "threat", "alert", "breaking"
-        ]
         
-        for claim in claims:
-            detected_keywords = [k for k in keywords if k in claim.text.lower()]
+        for claim, detected_keywords in zip(claims, self._match_keywords(claims)):
             if detected_keywords:
+                # Deterministic across processes, unlike the salted built-in hash()
+                alert_id = hashlib.blake2b(claim.text.encode('utf-8'), digest_size=16).hexdigest()
                 alerts.append(CrisisAlert(
-                    id=str(hash(claim.text)),
+                    id=alert_id,
                     title="Potential Crisis Detected",
                     severity="HIGH", # Simplified logic
                     region="Unknown", # Would need NER for this
@@ -0,0 +1,9 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+@pytest.fixture(scope="session")
+def client():
+    # One client (and app startup) shared by every test in the session
+    with TestClient(app) as test_client:
+        yield test_client
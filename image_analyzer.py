@@ -4,38 +4,228 @@ Provides AI-generated image detection and reverse image search capabilities.
 """
 import os
 import io
+import asyncio
 import base64
-from typing import Dict, List, Optional, Tuple
+import hashlib
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 from PIL import Image
+import piexif
 import requests
-from huggingface_hub import InferenceClient
+from huggingface_hub import AsyncInferenceClient
+from cachetools import TTLCache
 
 # Load API keys
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 
+# Analysis results keyed by a blake2b digest of the image bytes, so repeat
+# uploads of the same (often viral) image skip inference
+_analysis_cache = TTLCache(maxsize=2000, ttl=86400)
+
+def _open_image(source: Union[bytes, BinaryIO, None]) -> Optional[Image.Image]:
+    """Open an image once for the fallback helpers; they retry and report errors themselves."""
+    try:
+        return Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    except Exception:
+        return None
+
+def _content_key(source: Union[bytes, BinaryIO]) -> bytes:
+    """blake2b digest of the image content, hashing file-like uploads in chunks"""
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.blake2b(source, digest_size=16).digest()
+    source.seek(0)
+    digest = hashlib.file_digest(source, lambda: hashlib.blake2b(digest_size=16)).digest()
+    source.seek(0)
+    return digest
+
+def _fallback_description(image_data: Optional[bytes], image: Optional[Image.Image] = None) -> Dict:
+    """
+    Fallback image description when Hugging Face API unavailable.
+    """
+    try:
+        if image is None:
+            image = Image.open(io.BytesIO(image_data))
+        width, height = image.size
+        format_type = image.format
+
+        description = f"An image in {format_type} format with dimensions {width}x{height} pixels."
+
+        return {
+            "description": description,
+            "model": "fallback_basic",
+            "confidence": "Low"
+        }
+    except Exception as e:
+        return {
+            "description": "Unable to describe image",
+            "model": "error",
+            "confidence": "None"
+        }
+
+def _fallback_ai_detection(image_data: Optional[bytes], image: Optional[Image.Image] = None) -> Dict:
+    """
+    Fallback AI detection using image properties analysis.
+    Used when Hugging Face API is unavailable.
+    """
+    try:
+        print("Using fallback AI detection (analyzing image properties)...")
+
+        # Open image unless the caller already did (header only; pixels are never needed)
+        if image is None:
+            image = Image.open(io.BytesIO(image_data))
+
+        # Analyze properties
+        width, height = image.size
+        format_type = image.format
+        mode = image.mode
+
+        # Simple heuristics (not accurate, just for fallback)
+        score = 50.0  # Start neutral
+
+        # AI images often have perfect dimensions
+        if width == height or (width % 512 == 0 and height % 512 == 0):
+            score += 15
+
+        # Check for common AI image sizes
+        common_ai_sizes = [(512, 512), (1024, 1024), (768, 768), (1024, 768)]
+        if (width, height) in common_ai_sizes:
+            score += 20
+
+        # Very high resolution might indicate real photo
+        if width > 3000 or height > 3000:
+            score -= 20
+
+        # Limit score
+        score = max(0, min(100, score))
+
+        if score > 70:
+            verdict = "Possibly AI-Generated (Fallback Analysis)"
+        elif score > 40:
+            verdict = "Uncertain (Fallback Analysis)"
+        else:
+            verdict = "Possibly Real Photo (Fallback Analysis)"
+
+        return {
+            "ai_probability": round(score, 2),
+            "real_probability": round(100 - score, 2),
+            "verdict": verdict,
+            "confidence": "Low",
+            "model": "fallback_heuristic",
+            "details": {
+                "width": width,
+                "height": height,
+                "format": format_type,
+                "mode": mode
+            }
+        }
+
+    except Exception as e:
+        print(f"ERROR in fallback detection: {e}")
+        return {
+            "ai_probability": 50.0,
+            "real_probability": 50.0,
+            "verdict": "Analysis Failed",
+            "confidence": "None",
+            "model": "error",
+            "details": {"error": str(e)}
+        }
+
+def _count_exif_tags(image_data: Optional[bytes], image: Image.Image) -> int:
+    """
+    Count top-level EXIF tags. For JPEG/TIFF/WebP bytes, piexif reads the
+    APP1 segment without decoding pixels; otherwise PIL's getexif is used.
+    """
+    try:
+        if image_data is not None:
+            return len(piexif.load(image_data)["0th"])
+    except Exception:
+        pass
+    return len(image.getexif())
+
+def extract_metadata(image_data: Optional[bytes], image: Optional[Image.Image] = None) -> Dict:
+    """
+    Extract EXIF metadata from image.
+    """
+    try:
+        print("Extracting image metadata...")
+
+        if image is None:
+            image = Image.open(io.BytesIO(image_data))
+
+        # Basic info
+        metadata = {
+            "format": image.format,
+            "mode": image.mode,
+            "size": f"{image.size[0]}x{image.size[1]}",
+            "width": image.size[0],
+            "height": image.size[1],
+        }
+
+        # Try to get EXIF data
+        exif_tags_count = _count_exif_tags(image_data, image)
+        if exif_tags_count:
+            # Add some common EXIF tags
+            metadata["has_exif"] = True
+            metadata["exif_tags_count"] = exif_tags_count
+        else:
+            metadata["has_exif"] = False
+            metadata["note"] = "No EXIF data found (common in AI-generated images)"
+
+        return metadata
+
+    except Exception as e:
+        print(f"ERROR extracting metadata: {e}")
+        return {"error": str(e)}
+
+def _load_image(source: Union[bytes, BinaryIO], need_bytes: bool) -> Tuple[Optional[Image.Image], Optional[bytes]]:
+    """
+    Open the image and, for a file-like upload, read its bytes only if they
+    are needed (Hugging Face calls); blocking, so run it in a thread.
+    """
+    image = _open_image(source)
+    if isinstance(source, (bytes, bytearray)):
+        return image, source
+    if not need_bytes:
+        return image, None
+    source.seek(0)
+    return image, source.read()
+
+def _pipeline(image_data: Optional[bytes], image: Optional[Image.Image] = None) -> Dict:
+    """
+    Run the CPU-bound fallback analysis on one image.
+    Module-level and side-effect free, so it can run in a worker thread.
+    """
+    if image is None:
+        image = _open_image(image_data)
+    return {
+        "ai_detection": _fallback_ai_detection(image_data, image),
+        "description": _fallback_description(image_data, image),
+        "metadata": extract_metadata(image_data, image)
+    }
+
+
 class ImageAnalyzer:
     def __init__(self):
         self.hf_client = None
         if HUGGINGFACE_API_KEY:
-            self.hf_client = InferenceClient(token=HUGGINGFACE_API_KEY)
+            self.hf_client = AsyncInferenceClient(token=HUGGINGFACE_API_KEY)
             print("✓ Hugging Face client initialized")
         else:
             print("WARNING: HUGGINGFACE_API_KEY not set. AI detection will use fallback.")
     
-    def detect_ai_generated(self, image_data: bytes) -> Dict:
+    async def detect_ai_generated(self, image_data: bytes, image: Optional[Image.Image] = None) -> Dict:
         """
         Detect if an image is AI-generated using Hugging Face models.
         Returns probability and confidence score.
         """
         try:
             if not self.hf_client:
-                return self._fallback_ai_detection(image_data)
+                return _fallback_ai_detection(image_data, image)
             
             print("Analyzing image with Hugging Face AI detector...")
             
             # Use Hugging Face's AI image detection model
             # Model: umm-maybe/AI-image-detector or similar
-            result = self.hf_client.image_classification(
+            result = await self.hf_client.image_classification(
                 image=image_data,
                 model="umm-maybe/AI-image-detector"
             )
@@ -80,21 +270,21 @@ class ImageAnalyzer:
             
         except Exception as e:
             print(f"ERROR in AI detection: {e}")
-            return self._fallback_ai_detection(image_data)
+            return _fallback_ai_detection(image_data, image)
     
-    def describe_image(self, image_data: bytes) -> Dict:
+    async def describe_image(self, image_data: bytes, image: Optional[Image.Image] = None) -> Dict:
         """
         Generate a detailed description of the image using Hugging Face vision models.
         """
         try:
             if not self.hf_client:
-                return self._fallback_description(image_data)
+                return _fallback_description(image_data, image)
             
             print("Generating image description with Hugging Face...")
             
             # Use Hugging Face's image-to-text model
             # Model: Salesforce/blip-image-captioning-large or similar
-            result = self.hf_client.image_to_text(
+            result = await self.hf_client.image_to_text(
                 image=image_data,
                 model="Salesforce/blip-image-captioning-large"
             )
@@ -112,97 +302,7 @@ class ImageAnalyzer:
             
         except Exception as e:
             print(f"ERROR in image description: {e}")
-            return self._fallback_description(image_data)
-    
-    def _fallback_description(self, image_data: bytes) -> Dict:
-        """
-        Fallback image description when Hugging Face API unavailable.
-        """
-        try:
-            image = Image.open(io.BytesIO(image_data))
-            width, height = image.size
-            format_type = image.format
-            
-            description = f"An image in {format_type} format with dimensions {width}x{height} pixels."
-            
-            return {
-                "description": description,
-                "model": "fallback_basic",
-                "confidence": "Low"
-            }
-        except Exception as e:
-            return {
-                "description": "Unable to describe image",
-                "model": "error",
-                "confidence": "None"
-            }
-    
-    def _fallback_ai_detection(self, image_data: bytes) -> Dict:
-        """
-        Fallback AI detection using image properties analysis.
-        Used when Hugging Face API is unavailable.
-        """
-        try:
-            print("Using fallback AI detection (analyzing image properties)...")
-            
-            # Open image
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Analyze properties
-            width, height = image.size
-            format_type = image.format
-            mode = image.mode
-            
-            # Simple heuristics (not accurate, just for fallback)
-            score = 50.0  # Start neutral
-            
-            # AI images often have perfect dimensions
-            if width == height or (width % 512 == 0 and height % 512 == 0):
-                score += 15
-            
-            # Check for common AI image sizes
-            common_ai_sizes = [(512, 512), (1024, 1024), (768, 768), (1024, 768)]
-            if (width, height) in common_ai_sizes:
-                score += 20
-            
-            # Very high resolution might indicate real photo
-            if width > 3000 or height > 3000:
-                score -= 20
-            
-            # Limit score
-            score = max(0, min(100, score))
-            
-            if score > 70:
-                verdict = "Possibly AI-Generated (Fallback Analysis)"
-            elif score > 40:
-                verdict = "Uncertain (Fallback Analysis)"
-            else:
-                verdict = "Possibly Real Photo (Fallback Analysis)"
-            
-            return {
-                "ai_probability": round(score, 2),
-                "real_probability": round(100 - score, 2),
-                "verdict": verdict,
-                "confidence": "Low",
-                "model": "fallback_heuristic",
-                "details": {
-                    "width": width,
-                    "height": height,
-                    "format": format_type,
-                    "mode": mode
-                }
-            }
-            
-        except Exception as e:
-            print(f"ERROR in fallback detection: {e}")
-            return {
-                "ai_probability": 50.0,
-                "real_probability": 50.0,
-                "verdict": "Analysis Failed",
-                "confidence": "None",
-                "model": "error",
-                "details": {"error": str(e)}
-            }
+            return _fallback_description(image_data, image)
     
     def reverse_image_search(self, image_data: bytes) -> List[Dict]:
         """
@@ -235,60 +335,62 @@ class ImageAnalyzer:
             print(f"ERROR in reverse image search: {e}")
             return []
     
-    def extract_metadata(self, image_data: bytes) -> Dict:
+    def extract_metadata(self, image_data: bytes, image: Optional[Image.Image] = None) -> Dict:
         """
         Extract EXIF metadata from image.
         """
-        try:
-            print("Extracting image metadata...")
-            
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Basic info
-            metadata = {
-                "format": image.format,
-                "mode": image.mode,
-                "size": f"{image.size[0]}x{image.size[1]}",
-                "width": image.size[0],
-                "height": image.size[1],
-            }
-            
-            # Try to get EXIF data
-            exif_data = image.getexif()
-            if exif_data:
-                # Add some common EXIF tags
-                metadata["has_exif"] = True
-                metadata["exif_tags_count"] = len(exif_data)
-            else:
-                metadata["has_exif"] = False
-                metadata["note"] = "No EXIF data found (common in AI-generated images)"
-            
-            return metadata
-            
-        except Exception as e:
-            print(f"ERROR extracting metadata: {e}")
-            return {"error": str(e)}
+        return extract_metadata(image_data, image)
     
-    def analyze_image(self, image_data: bytes) -> Dict:
+    async def analyze_image(self, image_data: Union[bytes, BinaryIO]) -> Dict:
         """
         Perform complete image analysis.
         Combines AI detection, reverse search, and metadata extraction.
+        Accepts raw bytes or a seekable binary file (e.g. an upload's spooled file).
         """
+        # Hashing, decoding headers and EXIF parsing all block on CPU or on the
+        # (possibly disk-backed) upload, so they run in worker threads
+        cache_key = await asyncio.to_thread(_content_key, image_data)
+        cached = _analysis_cache.get(cache_key)
+        if cached is not None:
+            print("Returning cached image analysis")
+            return cached
+        
         print("=" * 50)
         print("Starting comprehensive image analysis...")
         print("=" * 50)
         
+        # Parse the image header once and share it across the fallback and
+        # metadata stages; Hugging Face calls still take the raw bytes
+        image, image_data = await asyncio.to_thread(_load_image, image_data, bool(self.hf_client))
+        
+        if self.hf_client:
+            # The two model calls are independent network round-trips
+            ai_detection, description, metadata = await asyncio.gather(
+                self.detect_ai_generated(image_data, image),
+                self.describe_image(image_data, image),
+                asyncio.to_thread(extract_metadata, image_data, image)
+            )
+        else:
+            fallback = await asyncio.to_thread(_pipeline, image_data, image)
+            ai_detection, description, metadata = fallback["ai_detection"], fallback["description"], fallback["metadata"]
+        
         results = {
-            "ai_detection": self.detect_ai_generated(image_data),
+            "ai_detection": ai_detection,
             "reverse_search": self.reverse_image_search(image_data),
-            "description": self.describe_image(image_data),
-            "metadata": self.extract_metadata(image_data)
+            "description": description,
+            "metadata": metadata
         }
         
         print("=" * 50)
         print("Image analysis complete!")
         print("=" * 50)
         
+        # Don't pin a fallback result for a day if the Hugging Face call failed
+        if not self.hf_client or not any(
+            results[stage]["model"].startswith("fallback") for stage in ("ai_detection", "description")
+        ):
+            _analysis_cache[cache_key] = results
+        
         return results
 
 
@@ -1,35 +1,42 @@
-import time
-import requests
+import asyncio
+import aiohttp
 import sys
 from datetime import datetime
+from typing import List
 
-def keep_alive(url, interval=840):
+async def ping(session: aiohttp.ClientSession, url: str):
+    try:
+        async with session.head(url, allow_redirects=False) as response:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{timestamp}] Ping {url} - Status: {response.status}")
+    except Exception as e:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] Error pinging {url}: {e}")
+
+async def keep_alive(urls: List[str], interval=840):
     """
-    Pings the specified URL every `interval` seconds (default 14 minutes).
+    Pings the specified URLs every `interval` seconds (default 14 minutes).
     Render free tier spins down after 15 minutes of inactivity.
+    A single session keeps connections alive between pings, and HEAD
+    requests avoid downloading the response body.
     """
-    print(f"Starting keep-alive for {url}")
+    print(f"Starting keep-alive for {', '.join(urls)}")
     print(f"Ping interval: {interval} seconds")
-    
-    while True:
-        try:
-            response = requests.get(url)
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"[{timestamp}] Ping {url} - Status: {response.status_code}")
-        except Exception as e:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"[{timestamp}] Error pinging {url}: {e}")
-        
-        time.sleep(interval)
+
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        while True:
+            await asyncio.gather(*(ping(session, url) for url in urls))
+            await asyncio.sleep(interval)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python keep_alive.py <your-render-url>")
+        print("Usage: python keep_alive.py <your-render-url> [<another-url> ...]")
         print("Example: python keep_alive.py https://truth-weaver-backend.onrender.com")
-        
+
         # Default fallback for convenience if user edits this file
         DEFAULT_URL = "https://truth-weaver-backend.onrender.com"
         print(f"\nNo URL provided. Using default: {DEFAULT_URL}")
-        keep_alive(DEFAULT_URL)
+        asyncio.run(keep_alive([DEFAULT_URL]))
     else:
-        keep_alive(sys.argv[1])
+        asyncio.run(keep_alive(sys.argv[1:]))
@@ -1,16 +1,81 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List
-import uuid
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Optional, List, Deque
+from collections import deque
+from contextlib import asynccontextmanager
+import os
+import random
+import itertools
+import functools
+import asyncio
+import time
+import threading
+import hashlib
+import traceback
+from cachetools import TTLCache
+from groq import Groq
 from datetime import datetime
 from models import (
     Claim, Evidence, ScoreResponse, ExplainResponse, 
-    CrisisResponse, ScanRequest, ScoreRequest, ExplainRequest
+    CrisisResponse, ScanRequest, MultiScanRequest, ScoreRequest, ExplainRequest
 )
-from agents import ScanAgent, VerifyAgent, ScoreAgent, ExplainAgent, CrisisAgent
+from agents import ScanAgent, VerifyAgent, ScoreAgent, ExplainAgent, CrisisAgent, http_client, GROQ_API_KEY
 from image_analyzer import image_analyzer
+from arq import create_pool
+from arq.connections import RedisSettings
+from worker import REDIS_URL, SCANNED_CLAIMS_KEY
 
-app = FastAPI(title="Crux-AI Backend")
+# Claim ids: a random per-process prefix plus a counter, so ids stay unique
+# across workers and restarts without reading the OS RNG for every claim
+_CLAIM_ID_PREFIX = os.urandom(6).hex()
+_claim_id_counter = itertools.count()
+
+def new_claim_id() -> str:
+    return f"{_CLAIM_ID_PREFIX}-{next(_claim_id_counter):x}"
+
+# arq connection used to enqueue scans; stays None without REDIS_URL, in
+# which case scans fall back to in-process background tasks
+redis_pool = None
+
+async def _drain_scanned_claims(redis):
+    """Move claims published by the scan worker into processed_claims"""
+    while True:
+        try:
+            item = await redis.blpop(SCANNED_CLAIMS_KEY, timeout=5)
+            if item:
+                claim = Claim.model_validate_json(item[1])
+                claim.id = new_claim_id()
+                processed_claims.append(claim)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ERROR draining scanned claims: {e}")
+            await asyncio.sleep(5)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global redis_pool
+    drain_task = None
+    if REDIS_URL:
+        try:
+            redis_pool = await create_pool(RedisSettings.from_dsn(REDIS_URL))
+            drain_task = asyncio.create_task(_drain_scanned_claims(redis_pool))
+            print("Scan queue connected; scans will run on the arq worker")
+        except Exception as e:
+            print(f"WARNING: Could not connect to Redis, scans will run in-process: {e}")
+            redis_pool = None
+    yield
+    if drain_task:
+        drain_task.cancel()
+    if redis_pool:
+        await redis_pool.close()
+        redis_pool = None
+    # Shared link-fetch/NewsData client; close its pooled HTTP/2 connections
+    await http_client.aclose()
+
+app = FastAPI(title="Crux-AI Backend", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS Setup
 app.add_middleware(
@@ -22,22 +87,128 @@ app.add_middleware(
 )
 
 # Initialize Agents
-scan_agent = ScanAgent()
 verify_agent = VerifyAgent()
+# Groq keeps its own connection pool, separate from the one used for user link fetches
 score_agent = ScoreAgent()
 explain_agent = ExplainAgent()
-crisis_agent = CrisisAgent()
 
-# In-memory storage for demo purposes
-processed_claims: List[Claim] = []
+# Scan and crisis agents are created on first use, so importing main stays
+# cheap for callers (e.g. tests) that never touch those endpoints
+@functools.cache
+def get_scan_agent() -> ScanAgent:
+    return ScanAgent()
 
-@app.get("/")
+@functools.cache
+def get_crisis_agent() -> CrisisAgent:
+    return CrisisAgent()
+
+# Shared Groq client for /api/chat so requests reuse its connection pool
+chat_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+
+# In-memory storage for demo purposes; bounded so memory and crisis scans stay flat
+MAX_PROCESSED_CLAIMS = 10_000
+processed_claims: Deque[Claim] = deque(maxlen=MAX_PROCESSED_CLAIMS)
+
+# Largest image upload accepted by /api/verify
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Verified claims keyed by normalized text + link, so repeated (often viral)
+# claims skip the search and LLM calls
+_verify_cache = TTLCache(maxsize=4096, ttl=3600)
+# Evidence sources that mark a failed link fetch or web search; a successful
+# link fetch is labelled "User Link: <title>"
+_FAILED_EVIDENCE_SOURCES = frozenset({"User Link", "Search Error"})
+
+# Last crisis check, reused while processed_claims is unchanged
+CRISIS_CACHE_TTL = 5.0
+_crisis_cache = {"key": None, "value": None, "expires": 0.0}
+
+# HEAD too, so keep_alive.py's body-less pings get a 200 instead of a 405
+@app.api_route("/", methods=["GET", "HEAD"])
 def health_check():
     return {"status": "CruxAI System Online"}
 
-@app.get("/api/claims", response_model=List[Claim])
-def get_claims():
-    return processed_claims
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already covers this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+@app.get("/api/claims", responses={200: {"model": List[Claim]}})
+def get_claims(request: Request):
+    # Snapshot: this runs in the threadpool while other requests append to the deque
+    claims = list(processed_claims)
+    # Claims are only ever appended, so the count and newest id identify the list
+    etag = f'W/"{len(claims)}-{claims[-1].id if claims else 0}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    # Stored claims are already validated; dump them directly instead of
+    # letting FastAPI re-validate every one against a response_model
+    return ORJSONResponse([c.model_dump(mode="json") for c in claims], headers={"ETag": etag})
+
+async def _verify_text(text: Optional[str], link: Optional[str]) -> dict:
+    """Verify, score and explain a text/link claim (existing functionality)"""
+    claim_text = text if text else f"Claim from: {link}"
+    
+    cache_key = hashlib.blake2b((claim_text.strip().lower() + "|" + (link or "")).encode(), digest_size=16).hexdigest()
+    cached = _verify_cache.get(cache_key)
+    if cached is not None:
+        cached_claim, score, explanation = cached
+        print(f"Using cached verification for: {claim_text[:50]}")
+        claim = cached_claim.model_copy(deep=True, update={"id": new_claim_id(), "timestamp": datetime.now()})
+        processed_claims.append(claim)
+        return {"claim": claim, "score": score, "explanation": explanation}
+    
+    # Create a new claim object
+    claim = Claim(
+        id=new_claim_id(),
+        text=claim_text,
+        status="processing"
+    )
+
+    # Verify using existing agents
+    claim = await verify_agent.verify(claim, link=link) # Assuming verify_agent.verify can take a Claim object and link
+    # Score and explain in one LLM call; /api/explain reuses the cached explanation.
+    # Claims from different requests are never combined into one prompt, so one
+    # user's text can't steer the scoring of another's
+    score, explanation = await score_agent.score_and_explain(claim)
+    
+    # Set status based on score
+    if score.verdict == "VERIFIED": # Assuming score object has a verdict
+        claim.status = "verified"
+    elif score.verdict == "FALSE": # Assuming score object has a verdict
+        claim.status = "false"
+    else:
+        claim.status = "unverified"
+    
+    processed_claims.append(claim)
+    # Never cache fallbacks: a transient Groq, fetch or search failure
+    # shouldn't be served for the next hour
+    scored = score_agent.has_result(claim, "en")
+    if scored and not any(e.source in _FAILED_EVIDENCE_SOURCES for e in claim.evidence):
+        _verify_cache[cache_key] = (claim.model_copy(deep=True), score, explanation)
+    
+    return {"claim": claim, "score": score, "explanation": explanation}
+
+async def _analyze_upload(image: UploadFile) -> dict:
+    """Run AI-generated image detection on an upload (NEW functionality)"""
+    try:
+        print(f"Received image: {image.filename}")
+        print(f"Image size: {image.size} bytes")
+        
+        # Analyze straight from the spooled upload instead of copying it into memory
+        analysis = await image_analyzer.analyze_image(image.file)
+        print("Image analysis complete!")
+        return {"image_analysis": analysis}
+        
+    except Exception as e:
+        print(f"ERROR analyzing image: {e}")
+        return {"image_analysis": {
+            "error": str(e),
+            "message": "Failed to analyze image"
+        }}
 
 @app.post("/api/verify")
 async def verify_claim(
@@ -56,103 +227,94 @@ async def verify_claim(
     result = {
         "claim": None,
         "score": None,
+        "explanation": None,
         "image_analysis": None
     }
     
-    # Handle text/link verification (existing functionality)
-    if text or link:
-        claim_text = text if text else f"Claim from: {link}"
-        
-        # Create a new claim object
-        claim = Claim(
-            id=str(uuid.uuid4()),
-            text=claim_text,
-            status="processing"
-        )
-
-        # Verify using existing agents
-        claim = verify_agent.verify(claim, link=link) # Assuming verify_agent.verify can take a Claim object and link
-        score = score_agent.score(claim)
-        
-        # Set status based on score
-        if score.verdict == "VERIFIED": # Assuming score object has a verdict
-            claim.status = "verified"
-        elif score.verdict == "FALSE": # Assuming score object has a verdict
-            claim.status = "false"
-        else:
-            claim.status = "unverified"
-        
-        processed_claims.append(claim)
-        
-        result["claim"] = claim
-        result["score"] = score
+    if image and image.size and image.size > MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image exceeds {MAX_IMAGE_BYTES // (1024 * 1024)} MB limit")
     
-    # Handle image analysis (NEW functionality)
+    # The text/link pipeline and the image analysis are independent, so run them together
+    tasks = []
+    if text or link:
+        tasks.append(_verify_text(text, link))
     if image:
-        try:
-            print(f"Received image: {image.filename}")
-            
-            # Read image data
-            image_data = await image.read()
-            print(f"Image size: {len(image_data)} bytes")
-            
-            # Analyze image
-            analysis = image_analyzer.analyze_image(image_data)
-            
-            result["image_analysis"] = analysis
-            print("Image analysis complete!")
-            
-        except Exception as e:
-            print(f"ERROR analyzing image: {e}")
-            result["image_analysis"] = {
-                "error": str(e),
-                "message": "Failed to analyze image"
-            }
+        tasks.append(_analyze_upload(image))
+    
+    for outcome in await asyncio.gather(*tasks):
+        result.update(outcome)
     
     return result
 
-@app.post("/api/score", response_model=ScoreResponse)
-def score_claim(request: ScoreRequest):
+# Scores and explanations come from our own agents, so they are dumped as-is
+# rather than re-validated against a response_model; the schema stays documented
+@app.post("/api/score", responses={200: {"model": ScoreResponse}})
+async def score_claim(request: ScoreRequest):
     # Construct a temporary claim object for scoring
     claim = Claim(
         text=request.claim_text,
         evidence=request.evidence
     )
-    return score_agent.score(claim)
+    score = await score_agent.score(claim)
+    return ORJSONResponse(score.model_dump())
 
-@app.post("/api/explain", response_model=ExplainResponse)
-def explain_verdict(request: ExplainRequest):
-    explanation = explain_agent.explain(request.claim_text, request.verdict, request.lang)
-    return ExplainResponse(explanation=explanation)
+@app.post("/api/explain", responses={200: {"model": ExplainResponse}})
+async def explain_verdict(request: ExplainRequest):
+    explanation = await run_in_threadpool(explain_agent.explain, request.claim_text, request.verdict, request.lang)
+    return ORJSONResponse({"explanation": explanation})
 
 @app.get("/api/crisis", response_model=CrisisResponse)
-def check_crisis():
-    claims_to_check = processed_claims
+async def check_crisis():
+    # Claims don't always carry an id, so identify the newest one by object identity
+    key = (len(processed_claims), id(processed_claims[-1]) if processed_claims else None)
+    if key == _crisis_cache["key"] and time.monotonic() < _crisis_cache["expires"]:
+        return _crisis_cache["value"]
+    
+    # Snapshot: the deque may be appended to while detection runs in the threadpool
+    claims_to_check = list(processed_claims)
     # If no claims have been processed locally, fetch fresh news to check for crises
     if not claims_to_check:
         print("No local claims found. Scanning for breaking news...")
-        claims_to_check = scan_agent.scan()
+        claims_to_check = await run_in_threadpool(get_scan_agent().scan)
         
-    return crisis_agent.detect_crisis(claims_to_check)
+    response = await run_in_threadpool(get_crisis_agent().detect_crisis, claims_to_check)
+    _crisis_cache.update(key=key, value=response, expires=time.monotonic() + CRISIS_CACHE_TTL)
+    return response
 
 def background_scan(source_url: str):
-    new_claims = scan_agent.scan(source_url)
+    new_claims = get_scan_agent().scan(source_url, only_new=True)
     for claim in new_claims:
-        claim.id = str(uuid.uuid4())
+        claim.id = new_claim_id()
         # Optional: Auto-verify scanned claims?
         # For now, just add them
         processed_claims.append(claim)
 
 @app.post("/api/scan")
-def trigger_scan(request: ScanRequest, background_tasks: BackgroundTasks):
-    background_tasks.add_task(background_scan, request.source_url)
+async def trigger_scan(request: ScanRequest, background_tasks: BackgroundTasks):
+    if redis_pool:
+        # Run the scan on the worker so it can't stall this process
+        await redis_pool.enqueue_job("scan_job", request.source_url)
+    else:
+        background_tasks.add_task(background_scan, request.source_url)
     return {"message": f"Scan initiated for {request.source_url}"}
 
+@app.post("/api/scan/multi")
+async def trigger_multi_scan(request: MultiScanRequest, background_tasks: BackgroundTasks):
+    """Run one scan on behalf of several sources"""
+    # ScanAgent.scan runs one fixed NewsData query and ignores source_url, so
+    # a scan per source would only repeat the same paid API call; scan once
+    sources = ", ".join(dict.fromkeys(request.source_urls))
+    if redis_pool:
+        await redis_pool.enqueue_job("scan_job", sources)
+    else:
+        background_tasks.add_task(background_scan, sources)
+    return {"message": f"One scan initiated covering: {sources}"}
+
 @app.get("/api/news/{category}")
-def get_news_by_category(category: str):
+async def get_news_by_category(category: str):
     """Fetch news by category"""
     try:
-        claims = scan_agent.scan_by_category(category)
+        claims = await get_scan_agent().scan_by_category(category)
         return {
             "category": category,
             "count": len(claims),
@@ -163,12 +325,16 @@ def get_news_by_category(category: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/agents")
-def get_agents_status():
+def get_agents_status(request: Request):
     try:
         # Calculate stats based on processed_claims
         total_processed = len(processed_claims)
+        # The stats below depend on nothing else
+        etag = f'W/"agents-{total_processed}"'
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
         
-        return {
+        return ORJSONResponse({
             "agents": [
                 {
                     "name": "ScanAgent",
@@ -207,34 +373,106 @@ def get_agents_status():
                 {"time": "Just now", "agent": "System", "action": "System health check passed", "status": "success"},
                 {"time": "1 min ago", "agent": "ScanAgent", "action": "Scanned for crisis events", "status": "success"},
             ]
-        }
+        }, headers={"ETag": etag})
     except Exception as e:
         print(f"Error in get_agents_status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Static findings for the mock forensic analysis, built once instead of per request
+_MANIP_HIGH = ("Potential face manipulation detected", "Compression artifacts analyzed")
+_MANIP_LOW = ("No significant manipulation detected", "Compression artifacts analyzed")
+
 @app.post("/api/forensics")
 def analyze_media(
     url: str = Form(None),
     file: UploadFile = File(None)
 ):
     # Mock forensic analysis
-    import random
     score = random.randint(10, 90)
     
     return {
         "defakeScore": score,
-        "manipulations": [
-            "Potential face manipulation detected" if score > 50 else "No significant manipulation detected",
-            "Compression artifacts analyzed"
-        ],
+        "manipulations": _MANIP_HIGH if score > 50 else _MANIP_LOW,
         "provenance": "Source origin analysis completed.",
         "recommendation": "HIGH RISK" if score > 60 else ("MODERATE RISK" if score > 30 else "LIKELY AUTHENTIC")
     }
 
+# Generation settings shared by the buffered and streamed chat replies
+CHAT_COMPLETION_PARAMS = {
+    "model": "llama-3.3-70b-versatile",  # Fast and capable
+    "temperature": 0.7,
+    "max_tokens": 150,
+    "top_p": 1,
+}
+
+CHAT_FALLBACK_RESPONSE = "I'm here to help! You can ask me about crisis alerts, agent status, or to verify claims. What would you like to know?"
+
+def _sse_event(data: str, event: Optional[str] = None) -> str:
+    # Multi-line payloads need a data: prefix on every line
+    prefix = f"event: {event}\n" if event else ""
+    return prefix + "".join(f"data: {line}\n" for line in data.split("\n")) + "\n"
+
+def _stream_chat(messages: List[dict]) -> StreamingResponse:
+    """
+    Relay Groq's streamed completion as server-sent events.
+    The SDK iterator blocks, so it is drained in the threadpool and handed
+    to the response through an asyncio.Queue. A failure before any text is
+    sent yields the canned reply; a failure mid-reply ends the stream with
+    an `error` event instead of gluing the canned text onto a partial answer.
+    If the client disconnects, the producer stops and closes the Groq stream.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        streamed = False
+        try:
+            stream = chat_client.chat.completions.create(messages=messages, stream=True, **CHAT_COMPLETION_PARAMS)
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        print("Chat client disconnected; closing Groq stream")
+                        break
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        streamed = True
+                        loop.call_soon_threadsafe(queue.put_nowait, delta)
+            finally:
+                stream.close()
+        except Exception as e:
+            print(f"ERROR streaming chat response: {e}")
+            if streamed:
+                loop.call_soon_threadsafe(queue.put_nowait, ("error", "Chat response was interrupted"))
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, CHAT_FALLBACK_RESPONSE)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    async def events():
+        producer = asyncio.ensure_future(run_in_threadpool(produce))
+        failed = False
+        try:
+            while (item := await queue.get()) is not None:
+                if isinstance(item, tuple):
+                    failed = True
+                    yield _sse_event(item[1], event=item[0])
+                else:
+                    yield _sse_event(item)
+            await producer
+            if not failed:
+                yield _sse_event("[DONE]")
+        finally:
+            # Runs on client disconnect too, so the producer thread is released
+            stop.set()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.post("/api/chat")
 async def chat(request: dict):
     """
     Chat endpoint using Hugging Face LLM for AI assistance (FREE!).
+    Send "stream": true to receive the reply as server-sent events.
     """
     try:
         user_message = request.get("message", "")
@@ -243,18 +481,12 @@ async def chat(request: dict):
         if not user_message:
             raise HTTPException(status_code=400, detail="Message is required")
         
-        # Use Hugging Face API for real LLM response
-        from huggingface_hub import InferenceClient
-        import os
-        
-        hf_api_key = os.getenv("HUGGINGFACE_API_KEY")
-        if not hf_api_key:
+        # The assistant stays in canned-reply mode until a Hugging Face key is configured
+        if not HUGGINGFACE_API_KEY:
             return {
                 "response": "I'm here to help! I can assist you with verifying claims, checking crisis alerts, or navigating the platform. How can I help you today?"
             }
         
-        client = InferenceClient(token=hf_api_key)
-        
         # Build messages for chat
         messages = [
             {
@@ -277,24 +509,21 @@ async def chat(request: dict):
         })
         
         # Use Groq API (same as credibility scoring - we know it works!)
-        from groq import Groq
-        
-        groq_api_key = os.getenv("GROQ_API_KEY")
-        if not groq_api_key:
+        if not chat_client:
             return {
                 "response": "I'm here to help! I can assist you with verifying claims, checking crisis alerts, or navigating the platform."
             }
         
-        client = Groq(api_key=groq_api_key)
+        # Stream tokens as they are generated so the first words arrive sooner
+        if request.get("stream"):
+            return _stream_chat(messages)
         
-        # Use Groq's chat completion
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",  # Fast and capable
+        # Use Groq's chat completion; the SDK call blocks, so keep it off the event loop
+        completion = await run_in_threadpool(
+            chat_client.chat.completions.create,
             messages=messages,
-            temperature=0.7,
-            max_tokens=150,
-            top_p=1,
-            stream=False
+            stream=False,
+            **CHAT_COMPLETION_PARAMS
         )
         
         response_text = completion.choices[0].message.content.strip()
@@ -305,13 +534,22 @@ async def chat(request: dict):
         
     except Exception as e:
         print(f"ERROR in chat endpoint: {e}")
-        import traceback
         traceback.print_exc()
         # Fallback response on error
         return {
-            "response": "I'm here to help! You can ask me about crisis alerts, agent status, or to verify claims. What would you like to know?"
+            "response": CHAT_FALLBACK_RESPONSE
         }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Claims, caches and chat state live in process memory, so each worker
+    # holds its own copy; only raise WEB_CONCURRENCY once that is acceptable
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+    )
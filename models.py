@@ -1,5 +1,6 @@
+import msgspec
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import Annotated, List, Optional, Literal
 from datetime import datetime
 
 class Evidence(BaseModel):
@@ -14,6 +15,30 @@ class ScoreResponse(BaseModel):
     consistency: int = Field(..., ge=0, le=100)
     verdict: Literal["VERIFIED", "FALSE", "MIXED", "UNVERIFIED"]
 
+ScoreValue = Annotated[int, msgspec.Meta(ge=0, le=100)]
+
+class ScorePayload(msgspec.Struct):
+    """
+    Score JSON as returned by the LLM. Decoded with msgspec, which is much
+    cheaper than building a Pydantic model per reply; converted to the
+    already-validated ScoreResponse for the API.
+    """
+    final_score: ScoreValue
+    source_reliability: ScoreValue
+    evidence_strength: ScoreValue
+    consistency: ScoreValue
+    verdict: Literal["VERIFIED", "FALSE", "MIXED", "UNVERIFIED"]
+    explanation: Optional[str] = None
+
+    def to_response(self) -> ScoreResponse:
+        return ScoreResponse.model_construct(
+            final_score=self.final_score,
+            source_reliability=self.source_reliability,
+            evidence_strength=self.evidence_strength,
+            consistency=self.consistency,
+            verdict=self.verdict
+        )
+
 class Claim(BaseModel):
     id: Optional[str] = None
     text: str
@@ -48,6 +73,9 @@ class ExplainResponse(BaseModel):
 class ScanRequest(BaseModel):
     source_url: str
 
+class MultiScanRequest(BaseModel):
+    source_urls: List[str] = Field(..., min_length=1)
+
 class VerifyRequest(BaseModel):
     text: str
 
@@ -0,0 +1,33 @@
+"""
+Scan Worker
+Runs news scans outside the API process so they never block its event loop.
+
+Start with:
+    arq worker.WorkerSettings
+
+Scanned claims are pushed to a Redis list that the API drains into its
+in-memory claim store.
+"""
+import os
+from arq.connections import RedisSettings
+from fastapi.concurrency import run_in_threadpool
+from agents import ScanAgent
+
+REDIS_URL = os.getenv("REDIS_URL")
+SCANNED_CLAIMS_KEY = "crux:scanned_claims"
+
+async def startup(ctx):
+    ctx["scan_agent"] = ScanAgent()
+
+async def scan_job(ctx, source_url: str) -> int:
+    """Scan a source and publish any new claims for the API to pick up"""
+    new_claims = await run_in_threadpool(ctx["scan_agent"].scan, source_url, only_new=True)
+    if new_claims:
+        await ctx["redis"].rpush(SCANNED_CLAIMS_KEY, *(claim.model_dump_json() for claim in new_claims))
+    print(f"Scan job for {source_url} published {len(new_claims)} claims")
+    return len(new_claims)
+
+class WorkerSettings:
+    functions = [scan_job]
+    on_startup = startup
+    redis_settings = RedisSettings.from_dsn(REDIS_URL or "redis://localhost:6379")